@@ -1,19 +1,98 @@
-from fastapi import FastAPI, Request, UploadFile, File, HTTPException, Form
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException, Form, Query, Depends
+from fastapi.responses import FileResponse, Response, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import aiofiles
+from starlette.formparsers import MultiPartParser
+from jinja2 import FileSystemBytecodeCache
+import orjson
+import asyncio
+import errno
+import os
+import re
+import secrets
+import functools
+import hashlib
+import logging
 import shutil
+import stat
+import threading
+import time
+from collections import deque, OrderedDict
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Union, Any
+from typing import List, Dict, Optional, Tuple, Union, Any, BinaryIO, Iterator
 
-# Create FastAPI app
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Create FastAPI app; orjson serializes the listing/search payloads much faster
+app = FastAPI(default_response_class=ORJSONResponse)
 # Use a path relative to the current file's location
-from pathlib import Path
 current_dir = Path(__file__).resolve().parent
 app.mount("/static", StaticFiles(directory=current_dir / "static"), name="static")
+SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+def format_size(size: int) -> str:
+    """Human-readable size as shown in listings: KB below 1 MB, up to TB"""
+    # bit_length picks the 1024-power directly instead of a comparison chain
+    unit = min(4, max(1, (size.bit_length() - 1) // 10))
+    return f"{size / (1 << (10 * unit)):.2f} {SIZE_UNITS[unit]}"
+
 templates = Jinja2Templates(directory="app/templates")
+templates.env.filters["filesize"] = format_size
+# In production templates only change on deploy: skip per-render mtime checks,
+# keep compiled bytecode across restarts and compile index.html once at import.
+# Elsewhere keep Jinja's auto-reload so template edits show up immediately.
+TEMPLATES_PRECOMPILED = os.getenv("ENV") == "prod"
+if TEMPLATES_PRECOMPILED:
+    templates.env.auto_reload = False
+    templates.env.bytecode_cache = FileSystemBytecodeCache()
+INDEX_TEMPLATE = templates.get_template("index.html")
+# Template output events grouped per streamed chunk
+INDEX_STREAM_BUFFER = 64
+
+# Size of each read/write when streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Hidden temp file an upload is written to before it is committed (see
+# FileSystem.upload). It doesn't embed the client's file name, so it stays
+# short however long that is.
+UPLOAD_TEMP_NAME = re.compile(r"\.upload-[0-9a-f]{16}\.part")
+# Number of directory listings kept in memory per FileSystem
+LISTING_CACHE_SIZE = 1024
+# Directories whose entry lists are remembered for folder sizing
+FOLDER_SIZE_CACHE_SIZE = 10_000
+# Limits that keep a single search from walking an entire huge volume
+SEARCH_MAX_DEPTH = 10
+SEARCH_MAX_RESULTS = 1000
+SEARCH_DEFAULT_LIMIT = 500
+# Searches are answered from an in-memory name index once one is built. It is
+# trusted for this many seconds; after that, or after changes made here, the
+# next search revalidates it with one stat per directory before using it.
+SEARCH_INDEX_TTL = 10
+# Volumes with more entries than this are never indexed, just walked. Only one
+# FileSystem per process holds an index at a time.
+SEARCH_INDEX_MAX_ENTRIES = 200_000
+# Seconds to wait before trying again after the volume was too large to index
+SEARCH_INDEX_RETRY = 300
+# Volumes whose FileSystem (and caches) survive switching away with change_directory
+FILESYSTEM_CACHE_SIZE = 8
+# Items of one move-multiple request moved at the same time (cross-device copies)
+MOVE_CONCURRENCY = 16
+# Entries encoded per chunk when streaming a JSON listing
+LISTING_STREAM_BATCH = 256
+
+# Shared pools so listings and searches don't spawn threads per request
+# Folder sizing is syscall-bound (the GIL is released inside scandir/stat), so
+# it gets more workers than there are cores
+FOLDER_SIZE_POOL = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4),
+                                      thread_name_prefix="folder-size")
+SEARCH_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="search")
+# First index builds get their own thread so a live search never queues behind one
+SEARCH_INDEX_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+
+def is_upload_temp(name: str) -> bool:
+    """Check whether name is an in-progress upload's temp file"""
+    return UPLOAD_TEMP_NAME.fullmatch(name) is not None
 
 class FileSystemError:
     """Error definitions for file system operations"""
@@ -29,171 +108,591 @@ class FileSystem:
     
     def __init__(self, base_dir: Path):
         self.base_dir = base_dir
+        self.base_str = os.path.normpath(base_dir)
+        # Trailing separator so '/vol' never matches '/volume'
+        self._base_prefix = os.path.join(self.base_str, "")
+        # Entry names keyed on (path, st_mtime_ns): a directory's mtime changes
+        # whenever an entry is added, removed or renamed in it. Sizes are not
+        # cached, since writing to a file in place leaves that mtime alone.
+        self._listing = functools.lru_cache(maxsize=LISTING_CACHE_SIZE)(self._scan_listing)
+        # Bumped on every change made through this app; the search index
+        # checks it to notice it is out of date
+        self._generation = 0
+        # Folder sizing: path -> (st_ino, st_mtime_ns, file names, subdirs).
+        # Only the entries are cached; file sizes are stat'ed on every walk.
+        # Shared by the folder-size pool threads, hence the lock.
+        self._dir_sizes: "OrderedDict[str, Tuple[int, int, List[str], List[str]]]" = OrderedDict()
+        self._dir_sizes_lock = threading.Lock()
+        # Search index state: (generation, checked at, usable), usable being
+        # False when the volume was too large to index
+        self._search_index: Optional[Tuple[int, float, bool]] = None
+        # The index itself, one record per directory in walk order:
+        # path -> (st_ino, st_mtime_ns, rel_path, [(name_folded, name, is_file)], [subdir names])
+        self._search_dirs: Dict[str, Tuple[int, int, str, List, List]] = {}
+        self._search_index_building = False
+        self._search_index_lock = threading.Lock()
+        # Held for a whole refresh, so concurrent searches don't repeat one
+        self._search_refresh_lock = threading.Lock()
+
+    def clear_listing_cache(self) -> None:
+        """Drop cached listings after this app changes the volume"""
+        self._listing.cache_clear()
+        self._generation += 1
 
     def raise_error(self, error: Tuple[str, int], detail: Optional[str] = None):
         """Raise an HTTP exception with predefined error messages"""
         message, status_code = error
         raise HTTPException(status_code=status_code, detail=detail or message)
 
-    def validate_path(self, path: Path, require_dir: bool = False) -> None:
-        """Validate path exists and is within base directory"""
-        if not self.base_dir.exists():
-            self.raise_error(FileSystemError.VOLUME_NOT_MOUNTED)
-        if not path.exists():
-            self.raise_error(FileSystemError.PATH_NOT_FOUND)
-        if not str(path).startswith(str(self.base_dir)):
+    def is_within_base(self, path: Union[Path, str]) -> bool:
+        """Check path lies inside the base directory (normalized first so '..' can't escape)"""
+        norm_path = os.path.normpath(path)
+        return norm_path == self.base_str or norm_path.startswith(self._base_prefix)
+
+    def validate_path(self, path: Union[Path, str], require_dir: bool = False) -> os.stat_result:
+        """Validate path exists and is within base directory, returning its stat"""
+        if not self.is_within_base(path):
             self.raise_error(FileSystemError.ACCESS_DENIED)
-        if require_dir and not path.is_dir():
+        # A single stat answers both "exists" and "is a directory"; the base
+        # dir is only checked when the lookup fails
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None:
+            if not os.path.isdir(self.base_str):
+                self.raise_error(FileSystemError.VOLUME_NOT_MOUNTED)
+            self.raise_error(FileSystemError.PATH_NOT_FOUND)
+        if require_dir and not stat.S_ISDIR(st.st_mode):
             self.raise_error(FileSystemError.DIRECTORY_NOT_FOUND)
+        return st
 
-    def get_folder_size(self, folder_path: Path) -> int:
+    def get_folder_size(self, folder_path: Union[Path, str]) -> int:
         """Calculate the total size of a folder recursively"""
         total_size = 0
-        try:
-            for item in folder_path.iterdir():
-                if item.is_file():
-                    try:
-                        total_size += item.stat().st_size
-                    except (PermissionError, OSError):
-                        pass  # Skip files we can't access
-                elif item.is_dir():
-                    total_size += self.get_folder_size(item)
-        except (PermissionError, OSError):
-            pass  # Skip folders we can't access
+        # A directory's mtime only changes when its own entries do, so an
+        # unchanged directory skips the scandir. Its files are still stat'ed,
+        # since writing to a file in place leaves that mtime alone.
+        # Explicit stack: no recursion limit on deep trees.
+        stack = [os.fspath(folder_path)]
+        while stack:
+            path = stack.pop()
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # Skip folders we can't access
+            with self._dir_sizes_lock:
+                cached = self._dir_sizes.get(path)
+                if cached is not None:
+                    self._dir_sizes.move_to_end(path)
+            if cached is None or cached[0] != st.st_ino or cached[1] != st.st_mtime_ns:
+                try:
+                    file_names, subdirs = self._scan_dir_entries(path)
+                except OSError:
+                    continue
+                cached = (st.st_ino, st.st_mtime_ns, file_names, subdirs)
+                with self._dir_sizes_lock:
+                    self._dir_sizes[path] = cached
+                    if len(self._dir_sizes) > FOLDER_SIZE_CACHE_SIZE:
+                        self._dir_sizes.popitem(last=False)
+            for name in cached[2]:
+                try:
+                    total_size += os.stat(os.path.join(path, name), follow_symlinks=False).st_size
+                except OSError:
+                    pass  # Skip files we can't access
+            stack.extend(cached[3])
         return total_size
 
-    def get_contents(self, path: Path) -> Dict[str, List]:
-        """Get directory contents and path parts"""
-        self.validate_path(path, require_dir=True)
+    @staticmethod
+    def _scan_dir_entries(path: str) -> Tuple[List[str], List[str]]:
+        """List the regular files directly in path and its subdirectories"""
+        file_names = []
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                # Symlinks are not followed, so links don't add their target's size
+                if entry.is_file(follow_symlinks=False):
+                    file_names.append(entry.name)
+                elif entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+        return file_names, subdirs
+
+    def _safe_folder_size(self, folder_path: str) -> int:
+        """Folder size, or 0 if it can't be calculated for some reason"""
+        try:
+            return self.get_folder_size(folder_path)
+        except Exception:
+            return 0
+
+    def _scan_listing(self, path: str, mtime_ns: int) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """Scan a directory for its file names and subfolder (name, path) pairs (cached via _listing)
+
+        Sizes are not part of the scan: file sizes change without touching
+        this directory's mtime, and folder sizes depend on the whole subtree.
+        """
+        file_names = []
+        folders = []
         
-        contents = {"files": [], "folders": [], "path_parts": []}
+        # DirEntry caches the entry type, so no stat is needed to sort them
+        with os.scandir(path) as it:
+            for entry in it:
+                if is_upload_temp(entry.name):
+                    continue
+                if entry.is_file():
+                    file_names.append(entry.name)
+                else:
+                    folders.append((entry.name, entry.path))
         
-        for item in path.iterdir():
-            if item.is_file():
-                # Add file with its size
-                try:
-                    file_size = item.stat().st_size
-                    contents["files"].append({"name": item.name, "size": file_size})
-                except Exception:
-                    # If we can't get size for some reason, show with no size
-                    contents["files"].append({"name": item.name, "size": 0})
-            else:
-                # Calculate folder size
-                try:
-                    folder_size = self.get_folder_size(item)
-                    contents["folders"].append({"name": item.name, "size": folder_size})
-                except Exception:
-                    # If we can't calculate size for some reason, show with no size
-                    contents["folders"].append({"name": item.name, "size": 0})
+        return file_names, folders
+
+    @staticmethod
+    def _file_sizes(path: str, file_names: List[str]) -> List[Dict[str, Any]]:
+        """Stat each file now, so sizes are current even when the listing is cached"""
+        files = []
+        for name in file_names:
+            try:
+                file_size = os.stat(os.path.join(path, name)).st_size
+            except OSError:
+                # If we can't get size for some reason, show with no size
+                file_size = 0
+            files.append({"name": name, "size": file_size})
+        return files
+
+    def get_contents(self, path: Union[Path, str], folder_sizes: bool = True) -> Dict[str, List]:
+        """Get directory contents and path parts
+
+        Without folder_sizes, folders get size None and no subtree is walked.
+        """
+        st = self.validate_path(path, require_dir=True)
         
-        rel_path = path.relative_to(self.base_dir)
-        contents["path_parts"] = str(rel_path).split('/') if str(rel_path) != '.' else []
+        path_str = os.fspath(path)
+        file_names, folder_entries = self._listing(path_str, st.st_mtime_ns)
+        files = self._file_sizes(path_str, file_names)
+        if folder_sizes:
+            # Sizes are recomputed on every request; get_folder_size revalidates
+            # each directory with one stat, so unchanged subtrees stay cheap.
+            # The walks are independent and syscall-bound, so run them side by side.
+            sizes = FOLDER_SIZE_POOL.map(self._safe_folder_size, [folder_path for _, folder_path in folder_entries])
+        else:
+            sizes = [None] * len(folder_entries)
+        folders = [{"name": name, "size": size} for (name, _), size in zip(folder_entries, sizes)]
+        contents = {"files": files, "folders": folders, "path_parts": []}
+        
+        # validate_path has established the normalized path is the base or
+        # lies under _base_prefix, so the relative part is a plain slice
+        rel_str = os.path.normpath(path_str)[len(self._base_prefix):]
+        contents["path_parts"] = rel_str.split(os.sep) if rel_str else []
         
         return contents
 
-    def search(self, query: str) -> Dict[str, List[Dict[str, str]]]:
-        """Search for files and folders recursively"""
+    def iter_listing(self, path: Union[Path, str]) -> Iterator[Dict[str, Any]]:
+        """Yield directory entries one at a time; folders carry no size field"""
+        with os.scandir(path) as it:
+            for entry in it:
+                if is_upload_temp(entry.name):
+                    continue
+                if entry.is_file():
+                    try:
+                        file_size = entry.stat().st_size
+                    except OSError:
+                        file_size = 0
+                    yield {"name": entry.name, "type": "file", "size": file_size}
+                else:
+                    # No "size": null either; it only padded every folder entry
+                    yield {"name": entry.name, "type": "folder"}
+
+    @staticmethod
+    def listing_etag(contents: Dict[str, List]) -> str:
+        """Weak ETag for a listing, derived from every name and size it shows"""
+        # Hashing the contents rather than the directory's mtime catches files
+        # growing in place, and gives every worker process the same tag
+        digest = hashlib.blake2b(orjson.dumps([contents["files"], contents["folders"]]), digest_size=8)
+        return f'W/"{digest.hexdigest()}"'
+
+    def _search_tree(self, pending: deque, query_folded: str, max_depth: int, max_results: int,
+                     stop: Optional[threading.Event] = None,
+                     defer: Optional[List] = None,
+                     folders_only: bool = False) -> Dict[str, List[Dict[str, str]]]:
+        """Breadth-first search from the (path, rel_path, depth) entries in pending
+        
+        Subdirectories are queued for this walk, or handed to defer instead
+        when given. The walk ends after max_results hits or once stop is set.
+        With folders_only, matching files are neither collected nor counted.
+        """
         results = {"files": [], "folders": []}
+        files_append = results["files"].append
+        folders_append = results["folders"].append
+        queue_dir = defer.append if defer is not None else pending.append
+        remaining = max_results
+        # Breadth-first walk so shallow matches come first and deep trees
+        # don't grow the Python call stack
+        while pending and remaining > 0 and not (stop and stop.is_set()):
+            path, rel_path, depth = pending.popleft()
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        name = entry.name
+                        item_rel_path = None
+                        
+                        if query_folded in name.casefold() and not is_upload_temp(name):
+                            is_file = entry.is_file()
+                            if folders_only and is_file:
+                                continue
+                            item_rel_path = f"{rel_path}/{name}" if rel_path else name
+                            append = files_append if is_file else folders_append
+                            append({
+                                "name": name,
+                                "path": item_rel_path
+                            })
+                            remaining -= 1
+                            if remaining <= 0:
+                                break
+                        
+                        # Don't descend through symlinks, which could loop forever
+                        if depth < max_depth and entry.is_dir(follow_symlinks=False):
+                            if item_rel_path is None:
+                                item_rel_path = f"{rel_path}/{name}" if rel_path else name
+                            queue_dir((entry.path, item_rel_path, depth + 1))
+            except PermissionError:
+                pass
+            except Exception as e:
+                # Lazy %-formatting: nothing is built unless the record is emitted
+                logger.warning("Error searching directory %s: %s", path, e)
+
+        return results
+
+    @staticmethod
+    def _scan_search_dir(path: str) -> Tuple[List, List]:
+        """Read one directory's entries for the search index"""
+        entries = []
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                name = entry.name
+                if is_upload_temp(name):
+                    continue
+                name_folded = name.casefold()
+                # Most names fold to themselves; keep one string, not two
+                entries.append((name if name_folded == name else name_folded, name, entry.is_file()))
+                # Don't descend through symlinks, which could loop forever
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(name)
+        return entries, subdirs
+
+    def _refresh_search_index(self) -> None:
+        """Bring the search index up to date with the volume
+
+        Only directories whose inode or mtime changed since the last refresh
+        are read again; an unchanged directory costs a single stat.
+        """
+        with self._search_refresh_lock:
+            generation, started = self._generation, time.monotonic()
+            previous = self._search_dirs
+            dirs = {}
+            usable = False
+            try:
+                total = 0
+                pending = deque([(self.base_str, "", 1)])
+                while pending and total <= SEARCH_INDEX_MAX_ENTRIES:
+                    path, rel_path, depth = pending.popleft()
+                    try:
+                        st = os.stat(path)
+                        record = previous.get(path)
+                        if record is None or record[0] != st.st_ino or record[1] != st.st_mtime_ns:
+                            record = (st.st_ino, st.st_mtime_ns, rel_path, *self._scan_search_dir(path))
+                    except OSError:
+                        continue  # Skip folders we can't access
+                    dirs[path] = record
+                    total += len(record[3])
+                    if depth < SEARCH_MAX_DEPTH:
+                        pending.extend((os.path.join(path, name), f"{rel_path}/{name}" if rel_path else name, depth + 1)
+                                       for name in record[4])
+                usable = total <= SEARCH_INDEX_MAX_ENTRIES
+            finally:
+                with self._search_index_lock:
+                    # Too large (or failed): keep nothing, searches walk instead
+                    self._search_dirs = dirs if usable else {}
+                    self._search_index = (generation, started, usable)
+                    self._search_index_building = False
+        if usable:
+            FileSystem._claim_search_index(self)
+
+    _search_index_owner: Optional["FileSystem"] = None
+    _search_index_owner_lock = threading.Lock()
+
+    @staticmethod
+    def _claim_search_index(fs: "FileSystem") -> None:
+        """Make fs the one FileSystem holding a search index, dropping any other's"""
+        with FileSystem._search_index_owner_lock:
+            previous, FileSystem._search_index_owner = FileSystem._search_index_owner, fs
+        if previous is not None and previous is not fs:
+            with previous._search_index_lock:
+                previous._search_dirs = {}
+                previous._search_index = None
+
+    def _current_search_index(self) -> Optional[Dict[str, Tuple]]:
+        """The search index, revalidated first if it may be out of date
+
+        Returns None while there is no usable index; the first build then
+        runs in the background so this search can walk the volume instead.
+        """
+        with self._search_index_lock:
+            current = self._search_index
+            if current is None or not current[2]:
+                # Never built, dropped, or too large last time (retried later)
+                if (not self._search_index_building
+                        and (current is None or time.monotonic() - current[1] >= SEARCH_INDEX_RETRY)):
+                    self._search_index_building = True
+                    SEARCH_INDEX_POOL.submit(self._refresh_search_index)
+                return None
+            if current[0] == self._generation and time.monotonic() - current[1] < SEARCH_INDEX_TTL:
+                return self._search_dirs
+        # Possibly stale: revalidating costs a stat per directory, still far
+        # less than walking the volume again
+        self._refresh_search_index()
+        with self._search_index_lock:
+            current = self._search_index
+            return self._search_dirs if current is not None and current[2] else None
+
+    @staticmethod
+    def _search_index_lookup(dirs: Dict[str, Tuple], query_folded: str, max_results: int,
+                             folders_only: bool = False) -> Dict[str, Any]:
+        """Answer a search from the index instead of walking the volume"""
+        results = {"files": [], "folders": []}
+        remaining = max_results
+        # Folders first, then files, each in walk order
+        for key, want_file in (("folders", False),) if folders_only else (("folders", False), ("files", True)):
+            append = results[key].append
+            for _, _, rel_path, entries, _ in dirs.values():
+                for name_folded, name, is_file in entries:
+                    if is_file is want_file and query_folded in name_folded:
+                        append({"name": name, "path": f"{rel_path}/{name}" if rel_path else name})
+                        remaining -= 1
+                        if remaining <= 0:
+                            break
+                if remaining <= 0:
+                    break
+            if remaining <= 0:
+                break
+        results["truncated"] = remaining <= 0
+        return results
+
+    def search(self, query: str, max_depth: int = SEARCH_MAX_DEPTH,
+               max_results: int = SEARCH_MAX_RESULTS, folders_only: bool = False) -> Dict[str, Any]:
+        """Search for files and folders recursively, up to max_depth levels and max_results hits
+        
+        'truncated' is set when the walk stopped at max_results, meaning there
+        may be more matches than were returned. With folders_only, files are
+        skipped and don't count towards max_results.
+        """
         if not self.base_dir.exists():
+            return {"files": [], "folders": [], "truncated": False}
+
+        query_folded = query.casefold()
+        # The index covers the default depth; until the first one is built,
+        # or while the volume is too large for one, walk the volume as before
+        if max_depth == SEARCH_MAX_DEPTH:
+            index = self._current_search_index()
+            if index is not None:
+                return self._search_index_lookup(index, query_folded, max_results, folders_only)
+
+        # Scan the top level here, then walk each top-level folder's subtree
+        # on its own thread; scandir releases the GIL while in the kernel
+        subtrees = []
+        results = self._search_tree(deque([(self.base_str, "", 1)]), query_folded,
+                                    max_depth, max_results, defer=subtrees, folders_only=folders_only)
+        remaining = max_results - len(results["files"]) - len(results["folders"])
+        results["truncated"] = remaining <= 0
+        if remaining <= 0 or not subtrees:
             return results
 
-        def search_dir(path: Path, rel_path: str = "") -> None:
-            try:
-                for item in path.iterdir():
-                    item_rel_path = f"{rel_path}/{item.name}" if rel_path else item.name
-                    
-                    if query.lower() in item.name.lower():
-                        item_type = "files" if item.is_file() else "folders"
-                        results[item_type].append({
-                            "name": item.name,
-                            "path": item_rel_path
-                        })
-                    
-                    if item.is_dir():
-                        try:
-                            search_dir(item, item_rel_path)
-                        except PermissionError:
-                            pass
-            except (PermissionError, Exception) as e:
-                if not isinstance(e, PermissionError):
-                    print(f"Error searching directory {path}: {str(e)}")
-
-        search_dir(self.base_dir)
+        stop = threading.Event()
+        futures = [
+            SEARCH_POOL.submit(self._search_tree, deque([subtree]), query_folded, max_depth, remaining, stop,
+                               folders_only=folders_only)
+            for subtree in subtrees
+        ]
+        try:
+            for future in futures:
+                sub_results = future.result()
+                for key in ("folders", "files"):
+                    matches = sub_results[key][:remaining]
+                    results[key].extend(matches)
+                    remaining -= len(matches)
+                if remaining <= 0:
+                    break
+        finally:
+            # Let any walks still running give up early
+            stop.set()
+        results["truncated"] = remaining <= 0
         return results
 
-    async def upload(self, file: UploadFile, path: Path) -> None:
+    @staticmethod
+    def _sendfile_copy(src_fd: int, dst_fd: int) -> None:
+        """Copy a whole file between descriptors inside the kernel"""
+        size = os.fstat(src_fd).st_size
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+
+    @staticmethod
+    def _copy_to_disk(source: BinaryIO, dest_path: Union[Path, str], size: Optional[int] = None) -> None:
+        """Copy a file object to dest_path, in-kernel when it is backed by a real file"""
+        with open(dest_path, 'xb', buffering=UPLOAD_CHUNK_SIZE) as out_file:
+            # Uploads larger than the multipart parser's spool size have rolled
+            # over to a real temp file with an fd we can sendfile() from; asking
+            # an in-memory one for fileno() would force it onto disk, so those
+            # take the copyfileobj path
+            if hasattr(os, "sendfile") and size is not None and size > MultiPartParser.max_file_size:
+                try:
+                    FileSystem._sendfile_copy(source.fileno(), out_file.fileno())
+                    return
+                except OSError:
+                    out_file.seek(0)
+                    out_file.truncate()
+            source.seek(0)
+            shutil.copyfileobj(source, out_file, UPLOAD_CHUNK_SIZE)
+
+    @staticmethod
+    def _commit_upload(source: BinaryIO, temp_path: str, dest_path: str, size: Optional[int] = None) -> None:
+        """Write source to temp_path, then move it into place at dest_path
+
+        Raises FileExistsError if dest_path was created in the meantime.
+        """
+        FileSystem._copy_to_disk(source, temp_path, size)
+        # link() is an exclusive create, unlike rename() which would silently
+        # replace a file another request put there since the lexists() check
+        try:
+            os.link(temp_path, dest_path)
+        except FileExistsError:
+            raise
+        except OSError:
+            # Filesystem without hard links: plain rename
+            os.replace(temp_path, dest_path)
+            return
+        os.unlink(temp_path)
+
+    async def upload(self, file: UploadFile, path: Union[Path, str]) -> Dict[str, str]:
         """Upload a file with atomic operation"""
         self.validate_path(path, require_dir=True)
         
         if not file:
             self.raise_error(FileSystemError.NO_FILE_UPLOADED)
         
-        file_path = path / file.filename
-        if file_path.exists():
+        # The client picks the name: it must be a single path component, or it
+        # could point the upload (and its temp file) outside this directory
+        name = file.filename
+        if not name or name in ('.', '..') or os.sep in name or (os.altsep and os.altsep in name):
+            self.raise_error(FileSystemError.ACCESS_DENIED, "Invalid file name")
+        file_str = os.path.join(path, name)
+        # lstat-based: one syscall, and a dangling symlink still counts as taken
+        if os.path.lexists(file_str):
             self.raise_error(FileSystemError.ITEM_EXISTS)
         
-        temp_path = file_path.with_suffix('.tmp')
+        # Unique per upload, so two uploads of the same name can't write into
+        # one temp file; listings and search skip it (see is_upload_temp)
+        temp_str = os.path.join(path, f".upload-{secrets.token_hex(8)}.part")
         try:
-            async with aiofiles.open(str(temp_path), 'wb') as out_file:
-                content = await file.read()
-                await out_file.write(content)
-            temp_path.rename(file_path)
+            # UploadFile is already spooled to a temp file, so copy it to disk
+            # without buffering it in Python. Copy and rename share one worker
+            # thread hop; _copy_to_disk reads from offset 0 itself.
+            await asyncio.to_thread(self._commit_upload, file.file, temp_str, file_str, file.size)
+            self.clear_listing_cache()
+            return {"message": f"{name} uploaded successfully", "name": name}
         except Exception as e:
-            if temp_path.exists():
-                temp_path.unlink()
+            try:
+                os.unlink(temp_str)
+            except OSError:
+                pass
+            if isinstance(e, FileExistsError):
+                self.raise_error(FileSystemError.ITEM_EXISTS)
             self.raise_error(FileSystemError.ACCESS_DENIED, str(e))
 
-    def create_folder(self, path: Path) -> Dict[str, str]:
+    def create_folder(self, path: Union[Path, str]) -> Dict[str, str]:
         """Create a new folder with unique name"""
         self.validate_path(path, require_dir=True)
         
         base_name = "Untitled Folder"
         folder_name = base_name
         counter = 1
+        existing = None
         
-        while (path / folder_name).exists():
-            folder_name = f"{base_name} {counter}"
-            counter += 1
-        
-        try:
-            (path / folder_name).mkdir()
-            return {"message": f"Folder {folder_name} created successfully", "name": folder_name}
-        except Exception as e:
-            self.raise_error(FileSystemError.ACCESS_DENIED, str(e))
+        # mkdir itself is the existence check. Only once the first name is
+        # taken is the directory read, in one go rather than a stat per
+        # candidate; if another request takes a name after that, move on
+        while True:
+            try:
+                os.mkdir(os.path.join(path, folder_name))
+                break
+            except FileExistsError:
+                pass
+            except Exception as e:
+                self.raise_error(FileSystemError.ACCESS_DENIED, str(e))
+            if existing is None:
+                try:
+                    with os.scandir(path) as it:
+                        existing = {entry.name for entry in it}
+                except Exception as e:
+                    self.raise_error(FileSystemError.ACCESS_DENIED, str(e))
+            existing.add(folder_name)
+            while folder_name in existing:
+                folder_name = f"{base_name} {counter}"
+                counter += 1
+        self.clear_listing_cache()
+        return {"message": f"Folder {folder_name} created successfully", "name": folder_name}
 
-    def file_operation(self, operation: str, source_path: Path, item_name: str,
-                      destination_path: Optional[Path] = None, new_name: Optional[str] = None) -> Dict[str, Any]:
+    def file_operation(self, operation: str, source_path: Union[Path, str], item_name: str,
+                      destination_path: Optional[Union[Path, str]] = None, new_name: Optional[str] = None) -> Dict[str, Any]:
         """Generic file operation handler for rename, delete, and move operations"""
         self.validate_path(source_path, require_dir=True)
-        item_path = source_path / item_name
-        self.validate_path(item_path)
+        item_path = os.path.join(source_path, item_name)
+        item_stat = self.validate_path(item_path)
         
         try:
             if operation == "rename":
                 if not new_name:
                     self.raise_error(FileSystemError.ACCESS_DENIED, "New name is required")
-                new_path = source_path / new_name
-                if new_path.exists():
+                new_path = os.path.join(source_path, new_name)
+                if not self.is_within_base(new_path):
+                    self.raise_error(FileSystemError.ACCESS_DENIED)
+                if os.path.lexists(new_path):
                     self.raise_error(FileSystemError.ITEM_EXISTS)
-                item_path.rename(new_path)
+                os.rename(item_path, new_path)
+                self.clear_listing_cache()
                 return {"message": f"Renamed successfully to {new_name}"}
                 
             elif operation == "delete":
-                if item_path.is_file():
-                    item_path.unlink(missing_ok=True)
+                if stat.S_ISREG(item_stat.st_mode):
+                    try:
+                        os.unlink(item_path)
+                    except FileNotFoundError:
+                        pass
                 else:
                     shutil.rmtree(item_path, ignore_errors=True)
+                self.clear_listing_cache()
                 return {"message": f"{item_name} deleted successfully"}
                 
             elif operation == "move":
                 if not destination_path:
                     self.raise_error(FileSystemError.ACCESS_DENIED, "Destination path is required")
                 self.validate_path(destination_path, require_dir=True)
-                dest_item_path = destination_path / item_name
-                if dest_item_path.exists():
+                dest_item_path = os.path.join(destination_path, item_name)
+                if os.path.lexists(dest_item_path):
                     self.raise_error(FileSystemError.ITEM_EXISTS)
-                shutil.move(str(item_path), str(destination_path))
-                return {"message": f"{item_name} moved successfully to {destination_path.name}"}
+                # Same-filesystem moves are a single rename(2); only copy
+                # across devices
+                try:
+                    os.rename(item_path, dest_item_path)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.move(item_path, os.fspath(destination_path))
+                self.clear_listing_cache()
+                dest_name = os.path.basename(os.path.normpath(destination_path))
+                return {"message": f"{item_name} moved successfully to {dest_name}"}
                 
             else:
                 self.raise_error(FileSystemError.ACCESS_DENIED, f"Unknown operation: {operation}")
@@ -203,33 +702,102 @@ class FileSystem:
         except Exception as e:
             self.raise_error(FileSystemError.ACCESS_DENIED, str(e))
     
-    def rename(self, path: Path, old_name: str, new_name: str) -> Dict[str, str]:
+    def rename(self, path: Union[Path, str], old_name: str, new_name: str) -> Dict[str, str]:
         """Rename a file or folder"""
         return self.file_operation("rename", path, old_name, new_name=new_name)
 
-    def delete(self, path: Path, item_name: str) -> Dict[str, str]:
-        """Delete a file or folder"""
-        return self.file_operation("delete", path, item_name)
+    async def delete(self, path: Union[Path, str], item_name: str) -> Dict[str, str]:
+        """Delete a file or folder (in a worker thread, trees can be large)"""
+        return await asyncio.to_thread(self.file_operation, "delete", path, item_name)
             
-    def move(self, source_path: Path, item_name: str, destination_path: Path) -> Dict[str, str]:
-        """Move a file or folder to another location"""
-        return self.file_operation("move", source_path, item_name, destination_path=destination_path)
+    async def move(self, source_path: Union[Path, str], item_name: str, destination_path: Union[Path, str]) -> Dict[str, str]:
+        """Move a file or folder to another location (in a worker thread)"""
+        return await asyncio.to_thread(self.file_operation, "move", source_path, item_name,
+                                       destination_path=destination_path)
             
-    def move_multiple(self, source_path: Path, item_names: List[str], destination_path: Path) -> Dict[str, List]:
+    @staticmethod
+    def _rename_batch(source_path: Union[Path, str], item_names: List[str],
+                      destination_path: Union[Path, str]) -> Tuple[List[str], List[str]]:
+        """Rename plain items between two directories on the same filesystem
+        
+        Both directories are opened once and every item is moved with a
+        dir_fd-relative rename(2), so the kernel never re-resolves the full
+        paths. Returns (moved, leftover); leftover items need the regular move.
+        """
+        if os.rename not in os.supports_dir_fd:
+            return [], list(item_names)
+        moved, leftover = [], []
+        # A directory that can't be opened (e.g. no read permission) just
+        # sends everything down the regular path
+        try:
+            src_fd = os.open(source_path, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            return [], list(item_names)
+        try:
+            try:
+                dst_fd = os.open(destination_path, os.O_RDONLY | os.O_DIRECTORY)
+            except OSError:
+                return [], list(item_names)
+            try:
+                if os.fstat(src_fd).st_dev != os.fstat(dst_fd).st_dev:
+                    return [], list(item_names)
+                for name in item_names:
+                    # Names must stay inside the two directories; anything else,
+                    # an existing target or a failed rename gets the full checks
+                    if name in ('', '.', '..') or os.sep in name:
+                        leftover.append(name)
+                        continue
+                    try:
+                        os.stat(name, dir_fd=dst_fd, follow_symlinks=False)
+                        leftover.append(name)
+                        continue
+                    except FileNotFoundError:
+                        pass
+                    except OSError:
+                        # e.g. ENAMETOOLONG; the regular move reports it
+                        leftover.append(name)
+                        continue
+                    try:
+                        os.rename(name, name, src_dir_fd=src_fd, dst_dir_fd=dst_fd)
+                        moved.append(name)
+                    except OSError:
+                        leftover.append(name)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        return moved, leftover
+
+    async def move_multiple(self, source_path: Union[Path, str], item_names: List[str],
+                            destination_path: Union[Path, str]) -> Dict[str, List]:
         """Move multiple files or folders to another location"""
         self.validate_path(source_path, require_dir=True)
         self.validate_path(destination_path, require_dir=True)
         
         results = {"success": [], "failed": []}
         
-        for item_name in item_names:
-            try:
-                self.move(source_path, item_name, destination_path)
+        moved, leftover = await asyncio.to_thread(self._rename_batch, source_path, item_names, destination_path)
+        if moved:
+            results["success"].extend(moved)
+            self.clear_listing_cache()
+        
+        # What's left is mostly cross-device copies, which overlap well; the
+        # semaphore keeps one request from flooding the thread pool
+        semaphore = asyncio.Semaphore(MOVE_CONCURRENCY)
+
+        async def move_one(item_name: str) -> None:
+            async with semaphore:
+                await self.move(source_path, item_name, destination_path)
+
+        outcomes = await asyncio.gather(*(move_one(item_name) for item_name in leftover),
+                                        return_exceptions=True)
+        for item_name, outcome in zip(leftover, outcomes):
+            if outcome is None:
                 results["success"].append(item_name)
-            except HTTPException as e:
-                results["failed"].append({"name": item_name, "error": e.detail})
-            except Exception as e:
-                error_message = str(e)
+            elif isinstance(outcome, HTTPException):
+                results["failed"].append({"name": item_name, "error": outcome.detail})
+            else:
+                error_message = str(outcome)
                 if "not found" in error_message.lower():
                     error_message = "Item not found"
                 elif "access" in error_message.lower():
@@ -239,10 +807,31 @@ class FileSystem:
         
         return results
 
+@functools.lru_cache(maxsize=FILESYSTEM_CACHE_SIZE)
+def filesystem_for(base_str: str) -> FileSystem:
+    """FileSystem for a normalized base dir, reused so switching back finds warm caches"""
+    # Every cache inside validates itself against mtimes or a TTL, so an
+    # instance stays correct while another volume is selected
+    return FileSystem(Path(base_str))
+
+@dataclass(frozen=True)
+class AppState:
+    """Immutable per-volume state shared by the route handlers"""
+    fs: FileSystem
+
+    @classmethod
+    def for_dir(cls, upload_dir: Path) -> "AppState":
+        return cls(filesystem_for(os.path.normpath(upload_dir)))
+
+def get_state(request: Request) -> AppState:
+    """Dependency returning the current AppState"""
+    return request.app.state.app_state
+
 # Initialize file system manager
 BASE_DIR = Path(__file__).resolve().parent.parent
-UPLOAD_DIR = Path('/workspace')
-fs = FileSystem(UPLOAD_DIR)
+# change_directory swaps in a whole new AppState; a request keeps the one
+# it was handed, so its paths and FileSystem always agree.
+app.state.app_state = AppState.for_dir(Path('/workspace'))
 
 @app.post("/change-directory")
 async def change_directory(request: Request):
@@ -257,18 +846,24 @@ async def change_directory(request: Request):
         if not Path(new_path).is_absolute():
             new_path = BASE_DIR / new_path
 
-        new_path = Path(new_path).resolve()
-        
+        new_path = Path(new_path)
+        # Absolute paths without '..' only need lexical cleanup; resolve()
+        # costs a readlink/stat per component
+        if new_path.is_absolute() and '..' not in new_path.parts:
+            new_path = Path(os.path.normpath(os.fspath(new_path)))
+        else:
+            new_path = new_path.resolve()
+
         # Validate the new directory
-        if not new_path.exists():
+        try:
+            st = os.stat(new_path)
+        except OSError:
             raise HTTPException(status_code=404, detail="Directory not found")
-        if not new_path.is_dir():
+        if not stat.S_ISDIR(st.st_mode):
             raise HTTPException(status_code=400, detail="Path must be a directory")
             
         # Update the file system manager
-        global UPLOAD_DIR, fs
-        UPLOAD_DIR = new_path
-        fs = FileSystem(UPLOAD_DIR)
+        request.app.state.app_state = AppState.for_dir(new_path)
         
         return {"message": "Directory changed successfully"}
     except HTTPException:
@@ -278,19 +873,66 @@ async def change_directory(request: Request):
 
 # Route handlers
 @app.get("/search")
-async def search(query: str = "", folders_only: bool = False):
-    """Search for files and folders"""
-    results = fs.search(query)
-    # If folders_only is True, return only folders
-    if folders_only:
-        results["files"] = []
-    return results
+async def search(query: str = "", folders_only: bool = False,
+                 limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_RESULTS),
+                 state: AppState = Depends(get_state)):
+    """Search for files and folders, stopping after limit matches"""
+    # Walking the volume is blocking I/O, keep it off the event loop
+    return await asyncio.to_thread(state.fs.search, query, max_results=limit, folders_only=folders_only)
+
+@app.get("/api/download/{path:path}")
+async def download(path: str, state: AppState = Depends(get_state)):
+    """Download a file"""
+    file_path = os.path.join(state.fs.base_str, path)
+    st = state.fs.validate_path(file_path)
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=400, detail="Path must be a file")
+    return FileResponse(file_path, filename=os.path.basename(file_path), stat_result=st)
+
+def stream_json_items(items: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode items as {"items": [...]} in batches, without building the whole list"""
+    yield b'{"items":['
+    batch = []
+    separator = b""
+    for item in items:
+        batch.append(separator + orjson.dumps(item))
+        separator = b","
+        if len(batch) >= LISTING_STREAM_BATCH:
+            yield b"".join(batch)
+            batch.clear()
+    batch.append(b"]}")
+    yield b"".join(batch)
+
+@app.get("/api/list/{path:path}")
+def list_directory(path: str = "", state: AppState = Depends(get_state)):
+    """Stream a directory listing as JSON; folder sizes are left out to keep it fast"""
+    volume = state.fs
+    current_path = os.path.join(volume.base_str, path)
+    volume.validate_path(current_path, require_dir=True)
+    return StreamingResponse(stream_json_items(volume.iter_listing(current_path)),
+                             media_type="application/json")
+
+@app.get("/api/folder-size/{path:path}")
+def folder_size(path: str, state: AppState = Depends(get_state)):
+    """Size of one folder, for pages rendered with ?sizes=0 to fill in afterwards"""
+    volume = state.fs
+    folder_path = os.path.join(volume.base_str, path)
+    volume.validate_path(folder_path, require_dir=True)
+    size = volume.get_folder_size(folder_path)
+    return {"size": size, "display": format_size(size)}
 
 @app.get("/")
 @app.get("/{path:path}")
-async def index(request: Request, path: str = ""):
-    """Render index page with directory contents"""
-    if not UPLOAD_DIR.exists():
+def index(request: Request, path: str = "", sizes: bool = True, state: AppState = Depends(get_state)):
+    """Render index page with directory contents
+
+    With sizes=0 the page is sent without walking any subfolder; folder sizes
+    are then fetched one by one from /api/folder-size.
+    """
+    # Plain def: all of this is blocking I/O and rendering, so FastAPI runs it
+    # in the threadpool.
+    volume = state.fs
+    if not volume.base_dir.exists():
         # Still render the page but with a warning
         return templates.TemplateResponse(
             "index.html",
@@ -298,7 +940,7 @@ async def index(request: Request, path: str = ""):
                 "request": request,
                 "error": "Warning: /workspace is not mounted",
                 "current_path": "",
-                "base_dir_name": UPLOAD_DIR.name,
+                "base_dir_name": volume.base_dir.name,
                 "files": [],
                 "folders": [],
                 "path_parts": []
@@ -306,17 +948,27 @@ async def index(request: Request, path: str = ""):
         )
     
     try:
-        current_path = UPLOAD_DIR / path
-        contents = fs.get_contents(current_path)
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "current_path": path,
-                "base_dir_name": UPLOAD_DIR.name,
-                **contents
-            }
-        )
+        current_path = os.path.join(volume.base_str, path)
+        # get_contents returns a fresh dict, so fill it in as the template
+        # context rather than copying it into a new one
+        context = volume.get_contents(current_path, folder_sizes=sizes)
+        # A revalidation still lists the directory, but skips rendering and
+        # sending the page when nothing it shows has changed
+        etag = volume.listing_etag(context)
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=cache_headers)
+        context["request"] = request
+        context["current_path"] = path
+        context["folder_sizes"] = sizes
+        context["base_dir_name"] = volume.base_dir.name
+        # Stream the template so large listings start sending before the
+        # whole page is rendered
+        template = INDEX_TEMPLATE if TEMPLATES_PRECOMPILED else templates.get_template("index.html")
+        stream = template.stream(context)
+        stream.enable_buffering(INDEX_STREAM_BUFFER)
+        return StreamingResponse(stream, media_type="text/html", headers=cache_headers)
     except HTTPException as e:
         # Handle errors gracefully
         return templates.TemplateResponse(
@@ -325,7 +977,7 @@ async def index(request: Request, path: str = ""):
                 "request": request,
                 "error": f"Error: {e.detail}",
                 "current_path": path,
-                "base_dir_name": UPLOAD_DIR.name,
+                "base_dir_name": volume.base_dir.name,
                 "files": [],
                 "folders": [],
                 "path_parts": []
@@ -333,58 +985,80 @@ async def index(request: Request, path: str = ""):
         )
 
 @app.post("/upload/{path:path}")
-async def upload_file(file: UploadFile = File(...), path: str = ""):
+async def upload_file(file: UploadFile = File(...), path: str = "", state: AppState = Depends(get_state)):
     """Upload a file to specified path"""
     try:
-        await fs.upload(file, UPLOAD_DIR / path)
-        return RedirectResponse(url=f"/{path}", status_code=303)
+        # A small JSON result rather than a redirect: the uploader's XHR would
+        # follow a 303 and render the whole listing, then refresh it again
+        return await state.fs.upload(file, os.path.join(state.fs.base_str, path))
     except HTTPException as e:
         if e.status_code == 400 and "Volume not mounted" in e.detail:
             return {"error": "Cannot upload: Volume not mounted. Please change to a valid directory."}
         raise
 
 @app.post("/create-folder/{path:path}")
-async def create_folder(path: str = ""):
+async def create_folder(path: str = "", state: AppState = Depends(get_state)):
     """Create a new folder"""
     try:
-        return fs.create_folder(UPLOAD_DIR / path)
+        # mkdir (and the scan after a name clash) is blocking I/O, keep it off the event loop
+        return await asyncio.to_thread(state.fs.create_folder, os.path.join(state.fs.base_str, path))
     except HTTPException as e:
         if e.status_code == 400 and "Volume not mounted" in e.detail:
             return {"error": "Cannot create folder: Volume not mounted. Please change to a valid directory."}
         raise
 
 @app.post("/rename/{path:path}")
-async def rename_item(path: str, old_name: str = Form(...), new_name: str = Form(...)):
+async def rename_item(path: str, old_name: str = Form(...), new_name: str = Form(...),
+                      state: AppState = Depends(get_state)):
     """Rename a file or folder"""
     try:
-        return fs.rename(UPLOAD_DIR / path, old_name, new_name)
+        return state.fs.rename(os.path.join(state.fs.base_str, path), old_name, new_name)
     except HTTPException as e:
         if e.status_code == 400 and "Volume not mounted" in e.detail:
             return {"error": "Cannot rename: Volume not mounted. Please change to a valid directory."}
         raise
 
 @app.post("/delete/{path:path}")
-async def delete_item(path: str, item_name: str = Form(...)):
+async def delete_item(path: str, item_name: str = Form(...), state: AppState = Depends(get_state)):
     """Delete a file or folder"""
     try:
-        return fs.delete(UPLOAD_DIR / path, item_name)
+        return await state.fs.delete(os.path.join(state.fs.base_str, path), item_name)
     except HTTPException as e:
         if e.status_code == 400 and "Volume not mounted" in e.detail:
             return {"error": "Cannot delete: Volume not mounted. Please change to a valid directory."}
         raise
 
+@app.post("/move-multiple/{path:path}")
+async def move_multiple_items(path: str, item_names: List[str] = Form(...), destination: str = Form(...),
+                              state: AppState = Depends(get_state)):
+    """Move several files or folders to a new location in one request"""
+    try:
+        volume = state.fs
+        destination = destination.strip()
+        dest_path = volume.base_str if destination in ('', '/') else os.path.join(volume.base_str, destination)
+        return await volume.move_multiple(os.path.join(volume.base_str, path), item_names, dest_path)
+    except HTTPException as e:
+        # Raised rather than returned: callers expect success/failed lists in
+        # a 200 response, so this has to arrive as an error
+        if e.status_code == 400 and "Volume not mounted" in e.detail:
+            raise HTTPException(status_code=400,
+                                detail="Cannot move: Volume not mounted. Please change to a valid directory.")
+        raise
+
 @app.post("/move/{path:path}")
-async def move_item(path: str, item_name: str = Form(...), destination: str = Form(...)):
+async def move_item(path: str, item_name: str = Form(...), destination: str = Form(...),
+                    state: AppState = Depends(get_state)):
     """Move a file or folder to a new location"""
     try:
         # Convert relative destination path to absolute path
         # If destination is empty or just a slash, use the root directory
+        volume = state.fs
         destination = destination.strip()
-        dest_path = UPLOAD_DIR if destination in ('', '/') else UPLOAD_DIR / destination
-        source_path = UPLOAD_DIR / path
+        dest_path = volume.base_str if destination in ('', '/') else os.path.join(volume.base_str, destination)
+        source_path = os.path.join(volume.base_str, path)
         
         # Call the move method
-        return fs.move(source_path, item_name, dest_path)
+        return await volume.move(source_path, item_name, dest_path)
     except HTTPException as e:
         if e.status_code == 400 and "Volume not mounted" in e.detail:
             return {"error": "Cannot move: Volume not mounted. Please change to a valid directory."}
@@ -57,14 +57,19 @@ const API = {
         return results;
     },
     
-    // Use the batch operation method for delete and move
+    // Deletes go one request per item; moves are batched server-side
     deleteMultipleItems: (path, itemNames) => 
         API.batchOperation(path, itemNames, API.deleteItem),
     
-    moveMultipleItems: (path, itemNames, destination) => 
-        API.batchOperation(path, itemNames, (path, itemName) => 
-            API.moveItem(path, itemName, destination)),
+    moveMultipleItems: (path, itemNames, destination) => {
+        const formData = API.createFormData({ destination });
+        itemNames.forEach(itemName => formData.append('item_names', itemName));
+        return API.request(`/move-multiple/${path || '.'}`, { method: 'POST', body: formData });
+    },
     
+    // Folder sizes for pages rendered with ?sizes=0
+    folderSize: (path) => API.request(`/api/folder-size/${path.split('/').map(encodeURIComponent).join('/')}`),
+
     // Search operations
     search: (query) => API.request(`/search?query=${encodeURIComponent(query)}`),
     searchFolders: (query) => API.request(`/search?query=${encodeURIComponent(query)}&folders_only=true`)
@@ -224,7 +229,8 @@ class UIManager {
                 // Don't navigate when in selection mode
                 if (!this.selectionMode) {
                     const path = e.target.dataset.path;
-                    if (path) location.href = path;
+                    // Keep ?sizes=0 while browsing
+                    if (path) location.href = path + window.location.search;
                 }
             }
             
@@ -314,7 +320,7 @@ class UIManager {
 
     async refreshContent() {
         try {
-            const response = await fetch(window.location.pathname);
+            const response = await fetch(window.location.pathname + window.location.search);
             const html = await response.text();
             const parser = new DOMParser();
             const doc = parser.parseFromString(html, 'text/html');
@@ -341,6 +347,7 @@ class UIManager {
 
                 // Reinitialize options listeners
                 this.initializeItemOptionsListeners();
+                loadFolderSizes();
 
                 return true;
             }
@@ -592,7 +599,7 @@ class UIManager {
 
             xhr.onload = () => {
                 this.currentXhr = null;
-                if (xhr.status === 200 || xhr.status === 303) {
+                if (xhr.status === 200) {
                     resolve();
                 } else {
                     try {
@@ -677,7 +684,8 @@ class UIManager {
             // Combine folder and file results
             this.elements.searchContent.innerHTML = 
                 generateResultHTML(results.folders, true) + 
-                generateResultHTML(results.files, false);
+                generateResultHTML(results.files, false) +
+                (results.truncated ? '<div class="search-truncated">Showing first matches only, refine your search</div>' : '');
                 
             this.showSearchResults();
         } catch (error) {
@@ -944,8 +952,23 @@ async function changeDirectory() {
 
 // Initialize UI
 let ui;
+// Fill in folder sizes left out of the page (?sizes=0), one request per folder
+function loadFolderSizes() {
+    document.querySelectorAll('.item-size[data-size-path]').forEach(async (element) => {
+        const path = element.dataset.sizePath;
+        element.removeAttribute('data-size-path');
+        try {
+            const data = await API.folderSize(path);
+            element.textContent = data.display;
+        } catch (error) {
+            element.textContent = '';
+        }
+    });
+}
+
 document.addEventListener('DOMContentLoaded', () => {
     ui = new UIManager();
+    loadFolderSizes();
 
     // Initialize directory input and button
     const directoryInput = DOM.getElement('directory-input');